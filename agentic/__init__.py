@@ -1,6 +1,6 @@
 """agentic - Async, typed LLM orchestration framework."""
 
-from .core import flow, loop
+from .core import flow, loop, iloop, aloop
 from .generate import generate, register_provider_alias, providers, parse_response
 
 __all__: list[str] = [
@@ -10,4 +10,6 @@ __all__: list[str] = [
     "register_provider_alias",
     "parse_response",
     "loop",
+    "iloop",
+    "aloop",
 ]
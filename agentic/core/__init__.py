@@ -1,7 +1,10 @@
-from .loop import loop
+from .loop import loop, iloop
+from .aloop import aloop
 from .flow import flow
 
 __all__: list[str] = [
     "flow",
     "loop",
+    "iloop",
+    "aloop",
 ]
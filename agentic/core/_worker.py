@@ -0,0 +1,14 @@
+import threading
+
+# Set on every thread owned by one of agentic's pools (flow or loop). Work
+# started on such a thread must not queue on a shared pool: the pool's threads
+# may all be blocked waiting on that very work, so it gets private threads.
+_agentic_worker = threading.local()
+
+
+def _mark_worker():
+    _agentic_worker.active = True
+
+
+def _on_worker() -> bool:
+    return getattr(_agentic_worker, "active", False)
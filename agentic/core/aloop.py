@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Coroutine, Iterable, TypeVar, overload, Union
+
+from .loop import _loop_context
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_ALOOP_CONCURRENCY = 32
+
+
+async def _gather(fn: Callable[..., Awaitable[R]], items: list, context: dict, concurrency: int) -> list[R]:
+    """Await `fn(item, **context)` for every item, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with semaphore:
+            return await fn(item, **context)
+
+    return list(await asyncio.gather(*(one(item) for item in items)))
+
+
+@overload
+def aloop(iterable: int, *, concurrency: int = _ALOOP_CONCURRENCY, **kwargs) -> Callable[[Callable[[int], Awaitable[R]]], Coroutine[Any, Any, list[R]]]: ...
+@overload
+def aloop(iterable: Iterable[T], *, concurrency: int = _ALOOP_CONCURRENCY, **kwargs) -> Callable[[Callable[[T], Awaitable[R]]], Coroutine[Any, Any, list[R]]]: ...
+
+def aloop(iterable: Union[int, Iterable[T]], *, concurrency: int = _ALOOP_CONCURRENCY, **explicit_context) -> Callable[[Callable[..., Awaitable[R]]], Coroutine[Any, Any, list[R]]]:
+    """
+    Execute a coroutine function over an iterable concurrently on the event loop.
+
+    The async counterpart of `loop()`: the decorated function is replaced by a
+    coroutine resolving to the results in input order, with at most
+    `concurrency` calls in flight. Context is merged exactly as in `loop()`.
+
+    Usage:
+        @aloop(items, query=query)
+        async def process(item, query):
+            ...
+
+        results = await process
+    """
+    if concurrency < 1:
+        raise ValueError("`concurrency` must be at least 1")
+
+    def decorator(fn: Callable[..., Awaitable[R]]) -> Coroutine[Any, Any, list[R]]:
+        if isinstance(iterable, int):
+            items: list[T] = list(range(iterable))  # type: ignore
+        else:
+            items = list(iterable)
+
+        # Merge in context from `with_context(...)` (can be overridden)
+        context = {**_loop_context, **explicit_context}
+
+        return _gather(fn, items, context, concurrency)
+
+    return decorator
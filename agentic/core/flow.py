@@ -1,108 +1,347 @@
 import ast
+import builtins
+import hashlib
+import heapq
 import inspect
+import marshal
+import os
+import sys
 import textwrap
+import queue
 import threading
-import concurrent.futures
+from array import array
+from pathlib import Path
 from collections import defaultdict
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
 
 from rich.live import Live
 from rich.table import Table
 from rich.console import Console
 
+from ._worker import _mark_worker, _on_worker
+
 # --------------------------------------------------------------------------- #
 #  Helper utilities                                                           #
 # --------------------------------------------------------------------------- #
+_BUILTIN_NAMES = frozenset(dir(builtins))
+
+
+class _ReadWriteVisitor(ast.NodeVisitor):
+    """Collect the names loaded and stored anywhere under a node."""
+
+    def __init__(self):
+        self.reads = set()
+        self.writes = set()
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load):
+            self.reads.add(node.id)
+        elif isinstance(node.ctx, ast.Store):
+            self.writes.add(node.id)
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        if isinstance(node.target, ast.Name):
+            self.reads.add(node.target.id)  # `x += 1` also loads x
+        self.generic_visit(node)
+
+    # Statements that bind a name without an `ast.Name` store.
+    def visit_Import(self, node: ast.Import | ast.ImportFrom):
+        for alias in node.names:
+            self.writes.add(alias.asname or alias.name.split(".")[0])
+
+    visit_ImportFrom = visit_Import
+
+    def visit_FunctionDef(self, node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef):
+        self.writes.add(node.name)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_ClassDef = visit_FunctionDef
+
+
 def _reads_writes(node: ast.stmt):
     """Return (reads, writes) variable-name sets for a single AST statement."""
-    reads, writes = set(), set()
+    visitor = _ReadWriteVisitor()
+    visitor.visit(node)
+    return visitor.reads, visitor.writes
 
-    if isinstance(node, ast.FunctionDef):
-        writes.add(node.name)
 
-    for n in ast.walk(node):
-        if isinstance(n, ast.Name):
-            if isinstance(n.ctx, ast.Load):
-                reads.add(n.id)
-            elif isinstance(n.ctx, ast.Store):
-                writes.add(n.id)
+def _compile_stmts(stmts: list[ast.stmt]):
+    """Compile a run of statements to a single code object ready for exec()."""
+    mod = ast.Module(body=stmts, type_ignores=[])
+    return compile(mod, filename="<flow>", mode="exec")
 
-    reads.difference_update(dir(__builtins__))
-    return reads, writes
 
+# --------------------------------------------------------------------------- #
+#  Graph cache                                                                #
+# --------------------------------------------------------------------------- #
+# Bump whenever the layout of the cached graph changes.
+_FLOW_CACHE_FORMAT = 8
+# Graphs are always memoised in-process. Setting AGENTIC_FLOW_CACHE_DIR also
+# persists them across runs; it is off by default because entries are code
+# objects that get exec'd, so only point it at a directory you trust.
+_FLOW_CACHE_DIR = Path(os.environ["AGENTIC_FLOW_CACHE_DIR"]) if os.environ.get("AGENTIC_FLOW_CACHE_DIR") else None
+_FLOW_GRAPH_CACHE: dict = {}
 
-def _compile_stmt(stmt: ast.stmt):
-    """Compile a single statement to a code object ready for exec()."""
-    mod = ast.Module(body=[stmt], type_ignores=[])
-    return compile(mod, filename="<flow>", mode="exec")
+
+def _build_graph(src: str):
+    """
+    Parse a flow function's source into its dependency graph.
+
+    Returns the tuple `(codes, deps_count, dependents, priority, reads,
+    read_only, inline_code, return_code)`. The first six are parallel tuples
+    indexed by node: `priority` is the length of the longest chain of nodes
+    starting at a node, `reads` names the variables it may load and
+    `read_only` the subset it never assigns. `inline_code` is the whole body
+    compiled as one module when scheduling cannot pay off (see below),
+    otherwise None.
+    """
+    tree = ast.parse(src)
+    fnode = next(n for n in tree.body if isinstance(n, ast.FunctionDef))
+    statements = fnode.body
+
+    stmts = []
+    stmt_deps = []
+    stmt_rw = []
+    var_producer = {}
+    return_expr = None
+
+    for stmt in statements:
+        if isinstance(stmt, ast.Return):
+            return_expr = stmt.value
+            continue
+
+        idx = len(stmts)
+        reads, writes = _reads_writes(stmt)
+        stmts.append(stmt)
+        stmt_rw.append((reads, writes))
+        stmt_deps.append({var_producer[v] for v in reads if v in var_producer})
+
+        for v in writes:
+            var_producer[v] = idx
+
+    stmt_dependents = defaultdict(set)
+    for child, deps in enumerate(stmt_deps):
+        for parent in deps:
+            stmt_dependents[parent].add(child)
+
+    # Contract chains: a statement whose only dependency is a parent with no
+    # other dependents would run straight after it anyway, so fuse the two into
+    # one node and save a thread hand-off. Statements are already in
+    # topological order, so one forward pass reaches the fixpoint.
+    group_of = []
+    groups = []
+    for idx, deps in enumerate(stmt_deps):
+        if len(deps) == 1:
+            (parent,) = deps
+            if len(stmt_dependents[parent]) == 1:
+                group = group_of[parent]
+                groups[group].append(idx)
+                group_of.append(group)
+                continue
+        group_of.append(len(groups))
+        groups.append([idx])
+
+    codes = tuple(_compile_stmts([stmts[i] for i in members]) for members in groups)
+    deps_count = tuple(len({group_of[p] for p in stmt_deps[members[0]]}) for members in groups)
+    dependents = tuple(
+        tuple(sorted({group_of[c] for c in stmt_dependents[members[-1]]}))
+        for members in groups
+    )
+
+    # Critical-path length of every node; groups are in topological order, so
+    # a reverse sweep sees each node's dependents first.
+    priority = [0] * len(groups)
+    for i in reversed(range(len(groups))):
+        priority[i] = 1 + max((priority[c] for c in dependents[i]), default=0)
+
+    # Builtins the flow never rebinds can't be in its namespace, so leave them
+    # out of the snapshots (names like `input` or `sum` may still be shadowed).
+    bound = {a.arg for a in ast.walk(fnode.args) if isinstance(a, ast.arg)}
+    unbound_builtins = _BUILTIN_NAMES.difference(bound, var_producer)
+    reads = []
+    read_only = []
+    for members in groups:
+        group_reads = set().union(*(stmt_rw[i][0] for i in members)) - unbound_builtins
+        group_writes = set().union(*(stmt_rw[i][1] for i in members))
+        reads.append(tuple(sorted(group_reads)))
+        read_only.append(frozenset(group_reads - group_writes))
+
+    # A flow that collapses to a single node, or whose statements make no calls
+    # (so cannot block on I/O), gains nothing from the pool: run it in place.
+    inline_code = None
+    if len(groups) <= 1 or not any(
+        isinstance(n, (ast.Call, ast.Await)) for stmt in stmts for n in ast.walk(stmt)
+    ):
+        inline_code = _compile_stmts(stmts)
+
+    if return_expr is None:
+        return_code = None
+    else:
+        return_code = compile(ast.Expression(return_expr), filename="<flow-return>", mode="eval")
+
+    return codes, deps_count, dependents, tuple(priority), tuple(reads), tuple(read_only), inline_code, return_code
+
+
+def _load_graph(src: str):
+    """
+    Return the graph for `src`, building it at most once per source text.
+
+    Graphs are memoised in-process and, when `_FLOW_CACHE_DIR` is set,
+    persisted there with `marshal`, keyed by a hash of the source and
+    interpreter version, so editing the function (or upgrading Python)
+    invalidates the entry.
+    """
+    key = hashlib.sha256(f"{_FLOW_CACHE_FORMAT}:{sys.version}:{src}".encode()).hexdigest()
+    graph = _FLOW_GRAPH_CACHE.get(key)
+    if graph is not None:
+        return graph
+
+    if _FLOW_CACHE_DIR is None:
+        graph = _FLOW_GRAPH_CACHE[key] = _build_graph(src)
+        return graph
+
+    path = _FLOW_CACHE_DIR / key
+    try:
+        graph = marshal.loads(path.read_bytes())
+    except (OSError, EOFError, ValueError, TypeError):
+        graph = _build_graph(src)
+        try:
+            _FLOW_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(marshal.dumps(graph))
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the disk cache is best-effort
+
+    _FLOW_GRAPH_CACHE[key] = graph
+    return graph
+
+
+# --------------------------------------------------------------------------- #
+#  Worker pool                                                                #
+# --------------------------------------------------------------------------- #
+# Shared by every flow; threads are spawned on demand and live for the process.
+# Nodes are usually I/O bound (LLM calls), so keep a generous floor on the size.
+_FLOW_MAX_WORKERS = max(32, (os.cpu_count() or 4) * 2)
+_work_q: queue.SimpleQueue = queue.SimpleQueue()
+_idle_workers = threading.Semaphore(0)
+_workers: list[threading.Thread] = []
+_workers_lock = threading.Lock()
+
+
+def _run_node(task):
+    """Run one node, reporting `(index, exception)` to its caller."""
+    code, globals_ns, node_ns, done_q, idx, abort = task
+    exc = None
+    if not abort.is_set():
+        try:
+            exec(code, globals_ns, node_ns)
+        except BaseException as e:
+            exc = e
+    done_q.put((idx, exc))
+
+
+def _flow_worker():
+    """Run queued nodes forever."""
+    _mark_worker()
+    while True:
+        _run_node(_work_q.get())
+        _idle_workers.release()
+
+
+def _dispatch(task):
+    """Queue a node for the workers, starting a new one if none is idle."""
+    _work_q.put(task)
+    if _idle_workers.acquire(blocking=False):
+        return
+    with _workers_lock:
+        if len(_workers) < _FLOW_MAX_WORKERS:
+            worker = threading.Thread(
+                target=_flow_worker, name=f"agentic-flow_{len(_workers)}", daemon=True
+            )
+            worker.start()
+            _workers.append(worker)
 
 
 # --------------------------------------------------------------------------- #
 #  The decorator                                                              #
 # --------------------------------------------------------------------------- #
 def flow(_fn=None, *, debug=False):
-    def decorator(fn):
-        # 1. --- Parse the function source ---------------------------------------
-        src = textwrap.dedent(inspect.getsource(fn))
-        tree = ast.parse(src)
-        fnode = next(n for n in tree.body if isinstance(n, ast.FunctionDef))
-        statements = fnode.body
-
-        # 2. --- Build nodes & dependencies --------------------------------------
-        nodes = []
-        var_producer = {}
-        dependents_map = defaultdict(set)
-        return_expr = None
-        return_reads = set()
-
-        for idx, stmt in enumerate(statements):
-            if isinstance(stmt, ast.Return):
-                return_expr = stmt.value
-                return_reads, _ = _reads_writes(stmt)
-                continue
+    """
+    Run a function's statements as a dependency graph, in parallel where possible.
 
-            reads, writes = _reads_writes(stmt)
-            deps = {var_producer[v] for v in reads if v in var_producer}
-            code = _compile_stmt(stmt)
-            nodes.append(dict(code=code, deps=set(deps), dependents=set()))
+    Each statement waits only for the statements that assign the names it
+    reads; independent statements run concurrently on a shared thread pool.
 
-            for v in writes:
-                var_producer[v] = idx
+    Thread safety: a running statement only ever sees its own copy of the
+    variables it reads, and its assignments are merged back into the flow's
+    namespace by the calling thread. No namespace dict is ever mutated from
+    more than one thread, which also holds on free-threaded (3.13t) builds.
+    That is the only guarantee: two independent statements assigning the
+    same name are merged in completion order, not source order, and objects
+    reachable from several statements (e.g. a list both append to) still
+    need the caller's own synchronisation.
 
-        for child_idx, n in enumerate(nodes):
-            for parent in n["deps"]:
-                dependents_map[parent].add(child_idx)
-        for idx, n in enumerate(nodes):
-            n["dependents"] = dependents_map[idx]
+    Usage:
+        @flow
+        def pipeline(query):
+            a = generate(model=..., prompt=query)
+            b = generate(model=..., prompt=query)   # runs alongside `a`
+            return a + b
 
-        # 3. --- Compile return expression ----------------------------------------
-        if return_expr is None:
-            return_code = None
-        else:
-            return_code = compile(ast.Expression(return_expr), filename="<flow-return>", mode="eval")
+    Pass `debug=True` to watch node status in a live table.
+    """
+    def decorator(fn):
+        # 1. --- Parse the function source & build the graph ---------------------
+        src = textwrap.dedent(inspect.getsource(fn))
+        (codes, deps_count, dependents, priority, reads, read_only,
+         inline_code, return_code) = _load_graph(src)
+
+        argnames = fn.__code__.co_varnames[:fn.__code__.co_argcount]
+        globals_ns = fn.__globals__
 
         # ----------------------------------------------------------------------- #
         #  The wrapped function                                                   #
         # ----------------------------------------------------------------------- #
         @wraps(fn)
         def wrapped(*args, **kwargs):
-            globals_ns = fn.__globals__
-            locals_ns = {}
-            argnames = fn.__code__.co_varnames[:fn.__code__.co_argcount]
-            locals_ns.update(dict(zip(argnames, args)))
+            locals_ns = dict(zip(argnames, args))
             locals_ns.update(kwargs)
 
-            deps_remaining = {i: len(n["deps"]) for i, n in enumerate(nodes)}
-            lock = threading.Lock()
-            futures = {}
-            statuses = {i: "pending" for i in range(len(nodes))}
-            executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(nodes) or 1)
+            if inline_code is not None and not debug:
+                exec(inline_code, globals_ns, locals_ns)
+                if return_code is None:
+                    return None
+                return eval(return_code, globals_ns, locals_ns)
+
+            deps_remaining = array("i", deps_count)
+            namespaces = [None] * len(codes)
+            running = 0
+            done_q = queue.SimpleQueue()
+            abort = threading.Event()
+            statuses = {i: "pending" for i in range(len(codes))}
             console = Console()
 
+            # A flow started on a flow or loop worker (directly or through
+            # other calls) must not queue behind the workers that may all be
+            # waiting on it, or wide enough nesting would deadlock the shared
+            # pool; give it private threads instead.
+            dispatch = _dispatch
+            executor = None
+            if _on_worker():
+                executor = ThreadPoolExecutor(
+                    max_workers=min(len(codes), _FLOW_MAX_WORKERS),
+                    initializer=_mark_worker,
+                )
+                dispatch = partial(executor.submit, _run_node)
+
             def submit_node(i):
+                # Each node runs against its own snapshot of the variables it
+                # reads, so workers never share (or mutate) `locals_ns`.
                 statuses[i] = "running"
-                fut = executor.submit(exec, nodes[i]["code"], globals_ns, locals_ns)
-                futures[fut] = i
+                node_ns = namespaces[i] = {v: locals_ns[v] for v in reads[i] if v in locals_ns}
+                dispatch((codes[i], globals_ns, node_ns, done_q, i, abort))
 
             def build_table():
                 table = Table(title="Flow Debugger")
@@ -116,33 +355,44 @@ def flow(_fn=None, *, debug=False):
             if live:
                 live.start()
 
-            for i, n in enumerate(nodes):
-                if deps_remaining[i] == 0:
-                    submit_node(i)
+            # Ready nodes wait in a heap so that, once the pool is saturated, the
+            # longest remaining chain is always started first.
+            ready = [(-priority[i], i) for i, count in enumerate(deps_count) if count == 0]
+            heapq.heapify(ready)
 
-            while futures:
-                done, _ = concurrent.futures.wait(
-                    futures, return_when=concurrent.futures.FIRST_COMPLETED
-                )
-                for fut in done:
-                    idx = futures.pop(fut)
-                    exc = fut.exception()
-                    if exc:
-                        statuses[idx] = "error"
-                        if live:
-                            live.update(build_table())
-                        executor.shutdown(wait=False, cancel_futures=True)
-                        raise exc
-                    statuses[idx] = "done"
-                    for child in nodes[idx]["dependents"]:
-                        with lock:
-                            deps_remaining[child] -= 1
-                            if deps_remaining[child] == 0:
-                                submit_node(child)
+            pending = len(codes)
+            while pending:
+                while ready and running < _FLOW_MAX_WORKERS:
+                    submit_node(heapq.heappop(ready)[1])
+                    running += 1
+                idx, exc = done_q.get()
+                pending -= 1
+                running -= 1
+                node_ns = namespaces[idx]
+                namespaces[idx] = None
+                if exc is not None:
+                    statuses[idx] = "error"
                     if live:
                         live.update(build_table())
+                    abort.set()  # queued nodes of this call are skipped
+                    if executor is not None:
+                        executor.shutdown(wait=False)
+                    raise exc
+                statuses[idx] = "done"
+                skip = read_only[idx]
+                for name, value in node_ns.items():
+                    if name not in skip:
+                        locals_ns[name] = value
+                # Only this thread touches the countdown, so no lock is needed.
+                for child in dependents[idx]:
+                    deps_remaining[child] -= 1
+                    if deps_remaining[child] == 0:
+                        heapq.heappush(ready, (-priority[child], child))
+                if live:
+                    live.update(build_table())
 
-            executor.shutdown(wait=True)
+            if executor is not None:
+                executor.shutdown(wait=False)
             if live:
                 live.stop()
 
@@ -1,5 +1,9 @@
-from typing import Callable, Iterable, TypeVar, overload, Union
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import inspect
+from typing import Callable, Iterable, Iterator, TypeVar, overload, Union
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+
+from ._worker import _mark_worker, _on_worker
 
 T = TypeVar("T")
 R = TypeVar("R")
@@ -7,14 +11,46 @@ R = TypeVar("R")
 # Global context store (overridden via `with_context(...)`)
 _loop_context: dict = {}
 
+_LOOP_MAX_WORKERS = 64
+
+# Shared by every loop() call; threads are spawned on demand and reused.
+_LOOP_POOL = ThreadPoolExecutor(
+    max_workers=_LOOP_MAX_WORKERS,
+    thread_name_prefix="agentic-loop",
+    initializer=_mark_worker,
+)
+
+
+def _submit_all(fn: Callable[..., R], items: list, context: dict) -> dict[Future, int]:
+    """Submit `fn(item, **context)` for every item, mapping each future to its index."""
+    executor: Executor = _LOOP_POOL
+    # A loop nested inside a loop or flow worker (directly or through other
+    # calls) must not wait on the shared pool, or a wide enough fan-out would
+    # deadlock it.
+    if _on_worker():
+        executor = ThreadPoolExecutor(
+            max_workers=min(len(items), _LOOP_MAX_WORKERS) or 1,
+            initializer=_mark_worker,
+        )
+    futures = {executor.submit(fn, item, **context): i for i, item in enumerate(items)}
+    if executor is not _LOOP_POOL:
+        executor.shutdown(wait=False)  # already-submitted work still runs
+    return futures
+
+
+def _cancel_all(futures: dict[Future, int]) -> None:
+    """Cancel every future that has not started yet; running calls still finish."""
+    for f in futures:
+        f.cancel()
+
 def with_context(**context):
     """
     Set global context variables for all upcoming loop() executions.
     Useful when decorating functions that rely on outer-scope variables
     (like those inside a @flow function).
     """
-    global _loop_context
-    _loop_context = context
+    _loop_context.clear()
+    _loop_context.update(context)
 
 
 @overload
@@ -40,6 +76,9 @@ def loop(iterable: Union[int, Iterable[T]], varname: str = "", **explicit_contex
         @loop(items, query=query)
         def process(item, query):
             ...
+
+    Coroutine functions are run on a fresh event loop via `aloop()`; inside
+    async code, use `await aloop(...)(fn)` directly instead.
     """
     def decorator(fn: Callable[..., R]) -> list[R]:
         if isinstance(iterable, int):
@@ -50,8 +89,68 @@ def loop(iterable: Union[int, Iterable[T]], varname: str = "", **explicit_contex
         # Merge in context from `with_context(...)` (can be overridden)
         context = {**_loop_context, **explicit_context}
 
-        with ThreadPoolExecutor(max_workers=len(items)) as executor:
-            futures = [executor.submit(fn, item, **context) for item in items]
-            return [f.result() for f in futures]
+        if inspect.iscoroutinefunction(fn):
+            from .aloop import _ALOOP_CONCURRENCY, _gather
+            return asyncio.run(_gather(fn, items, context, _ALOOP_CONCURRENCY))
+
+        futures = _submit_all(fn, items, context)
+        results: list = [None] * len(items)
+        try:
+            for f in as_completed(futures):
+                results[futures[f]] = f.result()
+        except BaseException:
+            # Don't leave the rest of the fan-out queued once the call has failed.
+            _cancel_all(futures)
+            raise
+        return results
+
+    return decorator
+
+
+@overload
+def iloop(iterable: int, varname: str = "", **kwargs) -> Callable[[Callable[[int], R]], Iterator[tuple[int, R]]]: ...
+@overload
+def iloop(iterable: Iterable[T], varname: str = "", **kwargs) -> Callable[[Callable[[T], R]], Iterator[tuple[int, R]]]: ...
+
+def iloop(iterable: Union[int, Iterable[T]], varname: str = "", **explicit_context) -> Callable[[Callable[..., R]], Iterator[tuple[int, R]]]:
+    """
+    Like `loop()`, but yield `(index, result)` pairs as soon as each call finishes.
+
+    Work is submitted immediately; results arrive in completion order, so
+    callers can start on early responses while slower ones are in flight.
+
+    Usage:
+        @iloop(items, query=query)
+        def process(item, query):
+            ...
+
+        for i, result in process:
+            ...
+
+    Coroutine functions are not supported; use `aloop()` for those.
+    """
+    def decorator(fn: Callable[..., R]) -> Iterator[tuple[int, R]]:
+        if inspect.iscoroutinefunction(fn):
+            raise TypeError("iloop() cannot run coroutine functions; use aloop() instead")
+
+        if isinstance(iterable, int):
+            items: list[T] = list(range(iterable))  # type: ignore
+        else:
+            items = list(iterable)
+
+        # Merge in context from `with_context(...)` (can be overridden)
+        context = {**_loop_context, **explicit_context}
+        futures = _submit_all(fn, items, context)
+
+        def results() -> Iterator[tuple[int, R]]:
+            try:
+                for f in as_completed(futures):
+                    yield futures[f], f.result()
+            finally:
+                # Runs on error and when the caller closes or abandons the
+                # generator early; finished futures are unaffected.
+                _cancel_all(futures)
+
+        return results()
 
     return decorator
@@ -49,7 +49,7 @@ def generate(
             f"Available providers: {', '.join(_PROVIDER_REGISTRY)}"
         )
 
-    structured = any([instructions, examples, input])
+    structured = instructions or examples or input
     if structured:
         final_user_message = _build_structured_prompt(
             instructions=instructions,
@@ -62,9 +62,8 @@ def generate(
             raise ValueError("`prompt` is required when not using structured prompt options.")
         final_user_message = prompt
 
-    messages: List[ChatCompletionMessageParam] = []
-    if chat_history:
-        messages.extend(chat_history)
+    # Shallow copy: the history's message dicts are never mutated here.
+    messages: List[ChatCompletionMessageParam] = list(chat_history) if chat_history else []
 
     if system is not None:
         messages.append({"role": "system", "content": system})
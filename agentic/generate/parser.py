@@ -5,6 +5,8 @@ import inspect
 import re
 import json
 import xmltodict
+from functools import lru_cache
+from xml.etree import ElementTree
 from typing import (
     Any,
     List,
@@ -17,9 +19,14 @@ from typing import (
     get_origin,
 )
 
-def _sanitize_xml(xml: str) -> str:
-    # only replace "&" that's not part of an existing entity (like &amp;)
-    return re.sub(r'&(?!\w+;)', '&amp;', xml)
+_FENCED_XML = re.compile(r"```(?:xml)?\s*(<.*?>.*?)```", re.DOTALL)
+_START_TAG = re.compile(r"<([a-zA-Z_][\w\-]*)[^>]*>")
+_BARE_AMPERSAND = re.compile(r"&(?!\w+;)")
+
+@lru_cache(maxsize=128)
+def _element_pattern(tag: str) -> re.Pattern[str]:
+    """Pattern matching a whole `<tag>...</tag>` element."""
+    return re.compile(fr"<{tag}[\s\S]*?</{tag}>", re.DOTALL)
 
 def _desanitize_xml(xml: str) -> str:
     return unescape(xml)
@@ -28,37 +35,86 @@ def _parse_single(data: Any, output: Type[BaseModel]):
     if inspect.isclass(output) and issubclass(output, BaseModel):
         # Single instance
         if isinstance(data, str):
-            return output.parse_raw(data)
-        return output.parse_obj(data)
+            return output.model_validate_json(data)
+        return output.model_validate(data)
     raise TypeError("`output` must be a BaseModel subclass or List[BaseModel]")
 
-def _extract_possible_xml(text: str) -> str:
+def _extract_and_sanitize(text: str) -> str:
     """
-    Attempts to extract the most plausible XML content from a given string,
-    even if it's not inside fences or has surrounding explanation text.
+    Extract the most plausible XML content from a given string, even if it's
+    not inside fences or has surrounding explanation text, and escape any bare
+    `&` in it so it parses.
     """
     # 1. Try to extract from a fenced block first (```xml or ```):
-    fenced = re.search(r"```(?:xml)?\s*(<.*?>.*?)```", text, re.DOTALL)
+    fenced = _FENCED_XML.search(text)
     if fenced:
-        return fenced.group(1).strip()
-
-    # 2. Try to extract a top-level XML tag by guessing (starts with < and ends with >)
-    tag_match = re.search(r"(<[a-zA-Z][\s\S]*?>)", text.strip())
-    if not tag_match:
-        return text.strip()  # fallback: return whole text
-
-    # 3. Try to find matching start + end tag
-    start_tag = re.search(r"<([a-zA-Z_][\w\-]*)[^>]*>", text)
-    if start_tag:
-        tag = start_tag.group(1)
-        pattern = fr"<{tag}[\s\S]*?</{tag}>"
-        full_xml = re.search(pattern, text, re.DOTALL)
-        if full_xml:
-            return full_xml.group(0).strip()
-
-    # 4. Fallback: just trim surrounding text, hope for the best
-    likely_xml = text.strip()
-    return likely_xml
+        xml = fenced.group(1)
+    else:
+        # 2. Try to find matching start + end tag, else keep the whole text
+        xml = text
+        start_tag = _START_TAG.search(text)
+        if start_tag:
+            full_xml = _element_pattern(start_tag.group(1)).search(text, start_tag.start())
+            if full_xml:
+                xml = full_xml.group(0)
+    xml = xml.strip()
+
+    # only replace "&" that's not part of an existing entity (like &amp;)
+    if "&" not in xml:
+        return xml
+    return _BARE_AMPERSAND.sub("&amp;", xml)
+
+def _element_to_data(elem: ElementTree.Element) -> Any:
+    """
+    Convert an element to the same shape `xmltodict` would produce for it:
+    stripped text (or None) for bare leaves, otherwise a dict of `@attributes`,
+    child tags (repeated tags become lists) and any `#text`.
+    """
+    text = elem.text.strip() if elem.text else ""
+    if not len(elem) and not elem.attrib:
+        return text or None
+
+    data: dict[str, Any] = {f"@{k}": v for k, v in elem.attrib.items()}
+    for child in elem:
+        value = _element_to_data(child)
+        if child.tag not in data:
+            data[child.tag] = value
+        elif isinstance(data[child.tag], list):
+            data[child.tag].append(value)
+        else:
+            data[child.tag] = [data[child.tag], value]
+    if text:
+        data["#text"] = text
+    return data
+
+def _find_list_items(root: ElementTree.Element, item_type: Type[BaseModel]) -> Optional[List[ElementTree.Element]]:
+    """
+    Locate the elements holding the items of a list response.
+
+    Prefers the first group of repeated sibling elements that have structure of
+    their own (depth-first, document order); failing that, any elements named
+    after `item_type`, which also covers a list holding a single item.
+    """
+    def first_repeated(parent: ElementTree.Element):
+        groups: dict[str, list] = {}
+        for child in parent:
+            groups.setdefault(child.tag, []).append(child)
+        for group in groups.values():
+            if len(group) > 1:
+                if all(len(e) or e.attrib for e in group):
+                    return group
+            elif len(group[0]):
+                found = first_repeated(group[0])
+                if found is not None:
+                    return found
+        return None
+
+    found = first_repeated(root) if len(root) else None
+    if found is not None:
+        return found
+
+    names = {item_type.__name__, item_type.__name__.lower()}
+    return [e for e in root.iter() if e.tag in names] or None
 
 T = TypeVar("T", bound=BaseModel)
 
@@ -73,46 +129,35 @@ def parse_response(
     origin = get_origin(output_schema) if output_schema else None
 
     if fmt == "json":
+        if output_schema and origin is not list:
+            # Let pydantic-core parse and validate the raw JSON in one step.
+            return _parse_single(raw, output_schema)
         parsed_json = json.loads(raw)
         if output_schema:
-            if origin is list:
-                item_type = get_args(output_schema)[0]
-                return [
-                    item_type.parse_obj(item)
-                    if isinstance(item, (dict, list))
-                    else item_type.parse_raw(item)
-                    for item in parsed_json
-                ]
-            return _parse_single(parsed_json, output_schema)
+            item_type = get_args(output_schema)[0]
+            return [
+                item_type.model_validate(item)
+                if isinstance(item, (dict, list))
+                else item_type.model_validate_json(item)
+                for item in parsed_json
+            ]
         return parsed_json
 
     if fmt == "xml":
-        cleaned = _extract_possible_xml(raw)
-        sanitized = _sanitize_xml(cleaned)
-        print("Sanitized XML input:")
-        print(sanitized)
+        sanitized = _extract_and_sanitize(raw)
+
+        if output_schema and origin is list:
+            item_type = get_args(output_schema)[0]
+            # Build the items straight from the element tree rather than going
+            # through xmltodict's intermediate dicts.
+            items = _find_list_items(ElementTree.fromstring(sanitized), item_type)
+            if items is None:
+                raise ValueError("Expected a list of objects, but none was found.")
+            return [item_type.model_validate(_element_to_data(item)) for item in items]
 
         parsed_xml = xmltodict.parse(sanitized)
 
         if output_schema:
-            if origin is list:
-                item_type = get_args(output_schema)[0]
-
-                def find_first_list(node: Any):
-                    if isinstance(node, list) and all(isinstance(i, dict) for i in node):
-                        return node
-                    if isinstance(node, dict):
-                        for v in node.values():
-                            found = find_first_list(v)
-                            if found is not None:
-                                return found
-                    return None
-
-                items = find_first_list(parsed_xml)
-                if items is None:
-                    raise ValueError("Expected a list of objects, but none was found.")
-                return [item_type.parse_obj(item) for item in items]
-
             return _parse_single(parsed_xml, output_schema)
 
         return parsed_xml
@@ -1,140 +1,209 @@
-from typing import List, Optional, Union, Dict, Any, Type, Literal
+from typing import Iterator, List, Optional, Sequence, Tuple, Union, Dict, Any, Type, Literal
 from pydantic import BaseModel
+from functools import lru_cache
 import json
-from rich import print
-from xml.dom import minidom
+import logging
+from xml.sax.saxutils import escape as _xml_escape
 
+logger = logging.getLogger(__name__)
 
-def _prettify_xml(xml_str: str) -> str:
-    """Helper function to properly indent XML string with consistent spacing."""
-    parsed = minidom.parseString(xml_str)
 
-    def _format_node(node, level=0):
-        result = []
-        if node.nodeType == node.TEXT_NODE:
-            text = node.data.strip()
-            if text:
-                result.append(" " * (level * 2) + text)
-        else:
-            if node.childNodes:
-                has_text_only = all(child.nodeType == child.TEXT_NODE for child in node.childNodes)
-
-                if has_text_only:
-                    text_content = "".join(child.data for child in node.childNodes).strip()
-                    result.append(" " * (level * 2) + f"<{node.tagName}>{text_content}</{node.tagName}>")
-                else:
-                    result.append(" " * (level * 2) + f"<{node.tagName}>")
-                    for child in node.childNodes:
-                        result.extend(_format_node(child, level + 1))
-                    result.append(" " * (level * 2) + f"</{node.tagName}>")
-            else:
-                result.append(" " * (level * 2) + f"<{node.tagName}></{node.tagName}>")
-
-        return result
-
-    root = parsed.documentElement
-    formatted_lines = _format_node(root)
-
-    return "\n".join(formatted_lines)
-
-
-def _dict_to_xml(data: Dict[str, Any], parent_tag: str = "") -> str:
+def _dict_to_xml(data: Dict[str, Any], indent: int = 0) -> List[str]:
     """
-    Convert a dictionary to XML format.
-    Handles nested dictionaries, lists, and primitive types.
+    Convert a dictionary to XML lines, indented two spaces per level.
+    Handles nested dictionaries, lists, and primitive types; values are
+    XML-escaped so the output is always well-formed.
     """
-    xml_parts = []
-
-    for key, value in data.items():
-        if isinstance(value, dict):
-            inner_xml = _dict_to_xml(value)
-            xml_parts.append(f"<{key}>{inner_xml}</{key}>")
-        elif isinstance(value, list):
-            list_parts = []
-            for item in value:
-                if isinstance(item, dict):
-                    list_parts.append(f"<{key[:-1] if key.endswith('s') else 'item'}>{_dict_to_xml(item)}</{key[:-1] if key.endswith('s') else 'item'}>")
-                else:
-                    list_parts.append(f"<{key[:-1] if key.endswith('s') else 'item'}>{item}</{key[:-1] if key.endswith('s') else 'item'}>")
-            xml_parts.append(f"<{key}>{''.join(list_parts)}</{key}>")
+    lines: List[str] = []
+    # Walk iteratively: each frame holds the (tag, value) pairs still to emit
+    # at one nesting level and the closing tag to write once they run out.
+    stack: List[Tuple[Iterator[Tuple[str, Any]], int, Optional[str]]] = [
+        (iter(data.items()), indent, None)
+    ]
+    while stack:
+        entries, level, closing = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            if closing is not None:
+                lines.append(closing)
+            continue
+
+        key, value = entry
+        pad = "  " * level
+        if isinstance(value, dict) and value:
+            lines.append(f"{pad}<{key}>")
+            stack.append((iter(value.items()), level + 1, f"{pad}</{key}>"))
+        elif isinstance(value, list) and value:
+            lines.append(f"{pad}<{key}>")
+            item_tag = key[:-1] if key.endswith('s') else 'item'
+            if not any(isinstance(item, dict) for item in value):
+                # Flat list: one formatted line per item, no frame needed.
+                item_pad = pad + "  "
+                lines.extend(
+                    f"{item_pad}<{item_tag}>{_xml_escape(str(item))}</{item_tag}>" for item in value
+                )
+                lines.append(f"{pad}</{key}>")
+                continue
+            # Items nest as elements only when they are dicts; anything else,
+            # nested lists included, is written out as text. The tag is bound
+            # here because `key` moves on before the items are consumed.
+            items = ((item_tag, str(item) if isinstance(item, list) else item) for item in value)
+            stack.append((items, level + 1, f"{pad}</{key}>"))
+        elif isinstance(value, (dict, list)):
+            lines.append(f"{pad}<{key}></{key}>")
         else:
-            xml_parts.append(f"<{key}>{value}</{key}>")
+            lines.append(f"{pad}<{key}>{_xml_escape(str(value))}</{key}>")
 
-    return "".join(xml_parts)
+    return lines
 
-def _model_dump(model: BaseModel) -> Dict[str, Any]:
-    return model.model_dump() if hasattr(model, "model_dump") else model.dict()
-
-def _build_structured_prompt(
-    *,
-    instructions: Optional[List[str]],
-    examples: Optional[List[Union[str, BaseModel]]],
+def _render_structured_prompt(
+    instructions: Sequence[str],
+    examples: Sequence[Tuple[Optional[str], Any]],
     user_input: Optional[Dict[str, Any]],
     fmt: Literal["xml", "json"],
 ) -> str:
-    """Convert structured‑prompt kwargs into a single user‑message string."""
-    if fmt not in ("xml", "json"):
-        raise ValueError("format must be 'xml' or 'json'")
-
+    """
+    Render the structured prompt. Each example is a `(model name, dumped data)`
+    pair for pydantic models, or `(None, example)` for anything else.
+    """
     # ------------------------------------------------------------------ JSON
     if fmt == "json":
         payload: Dict[str, Any] = {}
         if instructions:
             payload["instructions"] = instructions
         if examples:
-            payload["examples"] = [
-                _model_dump(ex) if isinstance(ex, BaseModel) else ex for ex in examples
-            ]
+            payload["examples"] = [ex for _, ex in examples]
         if user_input:
             payload["input"] = user_input
-        return json.dumps(payload, indent=2)
+        # Compact output: indentation only costs prompt tokens.
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
 
     # ------------------------------------------------------------------- XML
-    root_elements = []
+    # Emit already-indented lines directly; no wrapper document or reparse.
+    lines: List[str] = []
 
     if instructions:
-        instructions_xml = "<instructions>"
-        for ins in instructions:
-            instructions_xml += f"<instruction>{ins}</instruction>"
-        instructions_xml += "</instructions>"
-        root_elements.append(instructions_xml)
+        lines.append("<instructions>")
+        lines.extend(f"  <instruction>{ins}</instruction>" for ins in instructions)
+        lines.append("</instructions>")
 
     if examples:
-        examples_xml = "<examples>"
-        for ex in examples:
-            if isinstance(ex, BaseModel):
-                model_data = _model_dump(ex)
+        lines.append("<examples>")
+        for model_name, ex in examples:
+            if model_name is not None:
+                model_data = ex
 
                 try:
-                    inner_xml = _dict_to_xml(model_data)
-                    examples_xml += f"<example>{inner_xml}</example>"
+                    inner_lines = _dict_to_xml(model_data, indent=2)
                 except Exception as e:
-                    print(f"Warning: Error formatting example model {type(ex).__name__} as XML ({e}), falling back to JSON CDATA.")
+                    logger.warning(
+                        "Error formatting example model %s as XML (%s), falling back to JSON CDATA.",
+                        model_name, e,
+                    )
                     ex_json = json.dumps(model_data)
-                    examples_xml += f"<example>{ex_json}</example>"
+                    lines.append(f"  <example>{ex_json}</example>")
+                    continue
+
+                if inner_lines:
+                    lines.append("  <example>")
+                    lines.extend(inner_lines)
+                    lines.append("  </example>")
+                else:
+                    lines.append("  <example></example>")
             else:
-                examples_xml += f"<example>{ex}</example>"
-        examples_xml += "</examples>"
-        root_elements.append(examples_xml)
+                lines.append(f"  <example>{ex}</example>")
+        lines.append("</examples>")
 
     if user_input is not None:
-        input_xml = _dict_to_xml(user_input)
-        root_elements.append(f"<input>{input_xml}</input>")
+        if user_input:
+            lines.append("<input>")
+            lines.extend(_dict_to_xml(user_input, indent=1))
+            lines.append("</input>")
+        else:
+            lines.append("<input></input>")
 
-    combined_xml = "".join(root_elements)
-    wrapped_xml = f"<root>{combined_xml}</root>"
+    return "\n".join(lines)
 
-    pretty_xml = _prettify_xml(wrapped_xml)
 
-    lines = pretty_xml.splitlines()
+_FREEZABLE_SCALARS = frozenset({str, int, float, bool, type(None)})
 
-    formatted_lines = []
-    for line in lines[1:-1]:
-        if line.startswith("  "):
-            formatted_lines.append(line[2:])
-        else:
-            formatted_lines.append(line)
+def _freeze(value: Any) -> Any:
+    """
+    Hashable stand-in for prompt data that records every value's exact type,
+    so `1`/`True` or a list/tuple never share a cache entry; `_thaw` undoes
+    it. Raises TypeError for anything but plain scalars and containers: other
+    objects may render differently later (or must not be kept alive).
+    """
+    kind = type(value)
+    if kind is dict:
+        return (kind, tuple((_freeze(k), _freeze(v)) for k, v in value.items()))
+    if kind is list or kind is tuple:
+        return (kind, tuple(_freeze(v) for v in value))
+    if kind not in _FREEZABLE_SCALARS:
+        raise TypeError(f"cannot key prompt data of type {kind.__name__}")
+    return (kind, value)
+
+def _thaw(frozen: Any) -> Any:
+    kind, value = frozen
+    if kind is dict:
+        return {_thaw(k): _thaw(v) for k, v in value}
+    if kind is list or kind is tuple:
+        return kind(_thaw(v) for v in value)
+    return value
+
+
+@lru_cache(maxsize=256)
+def _build_structured_prompt_cached(
+    instructions: Any,
+    examples: Tuple[Tuple[Optional[str], Any], ...],
+    user_input: Any,
+    fmt: Literal["xml", "json"],
+) -> str:
+    """Render from the frozen key; model examples arrive as their JSON dump."""
+    return _render_structured_prompt(
+        _thaw(instructions),
+        [(name, json.loads(ex) if name is not None else _thaw(ex)) for name, ex in examples],
+        None if user_input is None else _thaw(user_input),
+        fmt,
+    )
 
-    final_xml = "\n".join(formatted_lines)
+def _build_structured_prompt(
+    *,
+    instructions: Optional[List[str]],
+    examples: Optional[List[Union[str, BaseModel]]],
+    user_input: Optional[Dict[str, Any]],
+    fmt: Literal["xml", "json"],
+) -> str:
+    """
+    Convert structured‑prompt kwargs into a single user‑message string.
 
-    return final_xml
+    Repeated calls with the same inputs are served from a cache keyed on the
+    instructions, each example (models by their `model_dump_json()`) and
+    `user_input`; cached or not, the prompt is rendered from the same data.
+    """
+    if fmt not in ("xml", "json"):
+        raise ValueError("format must be 'xml' or 'json'")
+    if not instructions and not examples and not user_input:
+        return ""
+
+    # Model examples are keyed, and rendered, by their JSON dump.
+    example_parts = [
+        (type(ex).__name__, ex.model_dump_json()) if isinstance(ex, BaseModel) else (None, ex)
+        for ex in examples or ()
+    ]
+    try:
+        key = (
+            _freeze(tuple(instructions or ())),
+            tuple((name, ex if name is not None else _freeze(ex)) for name, ex in example_parts),
+            None if user_input is None else _freeze(user_input),
+        )
+    except (TypeError, RecursionError):
+        # Arbitrary objects or too deeply nested to key: render the same data uncached.
+        return _render_structured_prompt(
+            instructions or (),
+            [(name, json.loads(ex) if name is not None else ex) for name, ex in example_parts],
+            user_input,
+            fmt,
+        )
+    return _build_structured_prompt_cached(*key, fmt)
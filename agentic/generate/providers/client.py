@@ -0,0 +1,15 @@
+from functools import lru_cache
+from typing import Optional
+
+from openai import OpenAI
+
+
+@lru_cache(maxsize=8)
+def _get_client(api_key: Optional[str], base_url: Optional[str]) -> OpenAI:
+    """
+    Return a shared OpenAI-compatible client for `(api_key, base_url)`.
+
+    Clients are thread-safe, so reusing one keeps its HTTP connection pool warm
+    across calls instead of paying for a new TCP + TLS handshake every request.
+    """
+    return OpenAI(api_key=api_key, base_url=base_url)
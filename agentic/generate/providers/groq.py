@@ -1,5 +1,6 @@
 from openai.types.chat import ChatCompletionMessageParam
 from agentic.generate.registry import register_provider
+from agentic.generate.providers.client import _get_client
 from typing import List, Optional
 
 @register_provider("groq", needs_api_key=True)
@@ -8,14 +9,10 @@ def _groq_generate(
     messages: List[ChatCompletionMessageParam],
     temperature: float = 0.7,
     api_key: Optional[str] = None,
+    strip: bool = True,
     **kwargs,
 ) -> str:
-    from openai import OpenAI
-
-    client = OpenAI(
-        api_key=api_key,
-        base_url="https://api.groq.com/openai/v1"
-    ) if api_key else OpenAI()
+    client = _get_client(api_key, "https://api.groq.com/openai/v1") if api_key else _get_client(None, None)
 
     response = client.chat.completions.create(
         model=model_id,
@@ -23,4 +20,5 @@ def _groq_generate(
         temperature=temperature,
         **kwargs
     )
-    return response.choices[0].message.content.strip()
+    content = response.choices[0].message.content or ""
+    return content.strip() if strip else content
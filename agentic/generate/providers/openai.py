@@ -1,5 +1,6 @@
 from openai.types.chat import ChatCompletionMessageParam
 from agentic.generate.registry import register_provider
+from agentic.generate.providers.client import _get_client
 from typing import List, Optional
 
 @register_provider("openai", needs_api_key=True, needs_base_url=True)
@@ -9,14 +10,10 @@ def _openai_generate(
     temperature: float = 0.7,
     api_key: Optional[str] = None,
     base_url: Optional[str] = None,
+    strip: bool = True,
     **kwargs,
 ) -> str:
-    from openai import OpenAI
-
-    client = OpenAI(
-        api_key=api_key,
-        base_url=base_url
-    ) if api_key or base_url else OpenAI()
+    client = _get_client(api_key, base_url)
 
     response = client.chat.completions.create(
         model=model_id,
@@ -24,4 +21,6 @@ def _openai_generate(
         temperature=temperature,
         **kwargs
     )
-    return response.choices[0].message.content.strip()
+    content = response.choices[0].message.content or ""
+    # Pass strip=False to keep whitespace the model emitted on purpose.
+    return content.strip() if strip else content
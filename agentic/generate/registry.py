@@ -3,7 +3,9 @@ from typing import Any, Dict, List, Callable
 from dotenv import load_dotenv
 from openai.types.chat import ChatCompletionMessageParam
 
-load_dotenv()
+# Set AGENTIC_SKIP_DOTENV to skip reading `.env` on import (e.g. in test runs).
+if not os.environ.get("AGENTIC_SKIP_DOTENV"):
+    load_dotenv()
 
 _ProviderFn = Callable[[str, List[ChatCompletionMessageParam]], str]
 
@@ -14,8 +16,10 @@ class _Provider:
         self._config: Dict[str, Any] = config or {}
 
     def generate(self, model_id: str, messages: List[ChatCompletionMessageParam], **kwargs) -> str:
-        combined_kwargs = {**self._config, **kwargs}
-        return self._generate_fn(model_id, messages, **combined_kwargs)
+        # `kwargs` is already a fresh dict, so only merge when there are defaults.
+        if self._config:
+            kwargs = {**self._config, **kwargs}
+        return self._generate_fn(model_id, messages, **kwargs)
 
     def configure(self, **kwargs):
         self._config.update(kwargs)
@@ -30,13 +34,14 @@ def register_provider(
 ):
     def _decorator(func: _ProviderFn):
         default_config: Dict[str, Any] = {}
+        name_upper = name.upper()
 
         if needs_api_key:
-            env_key = f"{name.upper()}_API_KEY"
+            env_key = f"{name_upper}_API_KEY"
             default_config["api_key"] = os.getenv(env_key)
 
         if needs_base_url:
-            env_base = f"{name.upper()}_BASE_URL"
+            env_base = f"{name_upper}_BASE_URL"
             default_config["base_url"] = os.getenv(env_base)
 
         _PROVIDER_REGISTRY[name] = _Provider(name, func, default_config)
@@ -45,9 +50,10 @@ def register_provider(
     return _decorator
 
 def configure_provider(name: str, **kwargs):
-    provider = _PROVIDER_REGISTRY.get(name)
-    if not provider:
-        raise ValueError(f"No provider named '{name}' registered.")
+    try:
+        provider = _PROVIDER_REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"No provider named '{name}' registered.") from None
     provider.configure(**kwargs)
 
 def register_provider_alias(
@@ -56,9 +62,10 @@ def register_provider_alias(
     type: str,
     **config
 ):
-    base = _PROVIDER_REGISTRY.get(type)
-    if not base:
-        raise ValueError(f"No provider named '{type}' registered.")
+    try:
+        base = _PROVIDER_REGISTRY[type]
+    except KeyError:
+        raise ValueError(f"No provider named '{type}' registered.") from None
 
     _PROVIDER_REGISTRY[name] = _Provider(
         name=name,
@@ -0,0 +1,176 @@
+import threading
+import time
+import unittest
+
+from agentic import flow, loop
+
+
+def slow(x):
+    time.sleep(0.01)
+    return x
+
+
+@flow
+def inner(x):
+    a = slow(x)
+    b = slow(x)
+    return a + b
+
+
+# More independent nodes than the shared pool's default 32 workers, each of
+# which runs a nested flow.
+@flow
+def outer(a):
+    v0 = inner(slow(a))
+    v1 = inner(slow(a))
+    v2 = inner(slow(a))
+    v3 = inner(slow(a))
+    v4 = inner(slow(a))
+    v5 = inner(slow(a))
+    v6 = inner(slow(a))
+    v7 = inner(slow(a))
+    v8 = inner(slow(a))
+    v9 = inner(slow(a))
+    v10 = inner(slow(a))
+    v11 = inner(slow(a))
+    v12 = inner(slow(a))
+    v13 = inner(slow(a))
+    v14 = inner(slow(a))
+    v15 = inner(slow(a))
+    v16 = inner(slow(a))
+    v17 = inner(slow(a))
+    v18 = inner(slow(a))
+    v19 = inner(slow(a))
+    v20 = inner(slow(a))
+    v21 = inner(slow(a))
+    v22 = inner(slow(a))
+    v23 = inner(slow(a))
+    v24 = inner(slow(a))
+    v25 = inner(slow(a))
+    v26 = inner(slow(a))
+    v27 = inner(slow(a))
+    v28 = inner(slow(a))
+    v29 = inner(slow(a))
+    v30 = inner(slow(a))
+    v31 = inner(slow(a))
+    v32 = inner(slow(a))
+    v33 = inner(slow(a))
+    v34 = inner(slow(a))
+    v35 = inner(slow(a))
+    v36 = inner(slow(a))
+    v37 = inner(slow(a))
+    v38 = inner(slow(a))
+    v39 = inner(slow(a))
+    return (
+        v0 + v1 + v2 + v3 + v4 + v5 + v6 + v7 + v8 + v9
+        + v10 + v11 + v12 + v13 + v14 + v15 + v16 + v17 + v18 + v19
+        + v20 + v21 + v22 + v23 + v24 + v25 + v26 + v27 + v28 + v29
+        + v30 + v31 + v32 + v33 + v34 + v35 + v36 + v37 + v38 + v39
+    )
+
+
+
+def inner_twice(a):
+    time.sleep(0.01)
+
+    @loop(2)
+    def results(i):
+        return inner(a)
+    return sum(results)
+
+
+# The same, but each node reaches the inner flow through a loop.
+@flow
+def outer_via_loop(a):
+    v0 = inner_twice(a)
+    v1 = inner_twice(a)
+    v2 = inner_twice(a)
+    v3 = inner_twice(a)
+    v4 = inner_twice(a)
+    v5 = inner_twice(a)
+    v6 = inner_twice(a)
+    v7 = inner_twice(a)
+    v8 = inner_twice(a)
+    v9 = inner_twice(a)
+    v10 = inner_twice(a)
+    v11 = inner_twice(a)
+    v12 = inner_twice(a)
+    v13 = inner_twice(a)
+    v14 = inner_twice(a)
+    v15 = inner_twice(a)
+    v16 = inner_twice(a)
+    v17 = inner_twice(a)
+    v18 = inner_twice(a)
+    v19 = inner_twice(a)
+    v20 = inner_twice(a)
+    v21 = inner_twice(a)
+    v22 = inner_twice(a)
+    v23 = inner_twice(a)
+    v24 = inner_twice(a)
+    v25 = inner_twice(a)
+    v26 = inner_twice(a)
+    v27 = inner_twice(a)
+    v28 = inner_twice(a)
+    v29 = inner_twice(a)
+    v30 = inner_twice(a)
+    v31 = inner_twice(a)
+    v32 = inner_twice(a)
+    v33 = inner_twice(a)
+    v34 = inner_twice(a)
+    v35 = inner_twice(a)
+    v36 = inner_twice(a)
+    v37 = inner_twice(a)
+    v38 = inner_twice(a)
+    v39 = inner_twice(a)
+    return (
+        v0 + v1 + v2 + v3 + v4 + v5 + v6 + v7 + v8 + v9
+        + v10 + v11 + v12 + v13 + v14 + v15 + v16 + v17 + v18 + v19
+        + v20 + v21 + v22 + v23 + v24 + v25 + v26 + v27 + v28 + v29
+        + v30 + v31 + v32 + v33 + v34 + v35 + v36 + v37 + v38 + v39
+    )
+
+
+# Names bound by import, class and def statements must reach later nodes.
+@flow
+def uses_local_bindings(n):
+    import json
+    from math import sqrt as root
+    class Point:
+        pass
+    async def noop():
+        pass
+    s = json.dumps(slow(n))
+    r = root(slow(n))
+    p = Point()
+    c = noop
+    return s, r, type(p).__name__, c.__name__
+
+
+def run_with_timeout(fn, timeout=30):
+    result = []
+    t = threading.Thread(target=lambda: result.append(fn()), daemon=True)
+    t.start()
+    t.join(timeout=timeout)
+    return t.is_alive(), result
+
+
+class NestedFlowTest(unittest.TestCase):
+    def test_nested_flows_do_not_deadlock(self):
+        hung, result = run_with_timeout(lambda: outer(1))
+        self.assertFalse(hung, "nested flows deadlocked")
+        self.assertEqual(result, [80])
+
+    def test_flow_through_loop_into_flow_does_not_deadlock(self):
+        hung, result = run_with_timeout(lambda: outer_via_loop(1))
+        self.assertFalse(hung, "flow nested through a loop deadlocked")
+        self.assertEqual(result, [160])
+
+
+
+class FlowBindingTest(unittest.TestCase):
+    def test_import_class_and_def_bindings_are_dependencies(self):
+        self.assertEqual(uses_local_bindings(4), ("4", 2.0, "Point", "noop"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,150 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from agentic import aloop, flow, iloop, loop
+from agentic.core.loop import _LOOP_MAX_WORKERS, with_context
+
+
+def slow(x):
+    time.sleep(0.01)
+    return x
+
+
+def double(x):
+    @loop(2)
+    def parts(i):
+        return slow(x)
+    return sum(parts)
+
+
+@flow
+def middle(x):
+    a = double(x)
+    b = slow(x)
+    return a + b
+
+
+def run_with_timeout(fn, timeout=30):
+    result = []
+    t = threading.Thread(target=lambda: result.append(fn()), daemon=True)
+    t.start()
+    t.join(timeout=timeout)
+    return t.is_alive(), result
+
+
+class NestedLoopTest(unittest.TestCase):
+    def test_loop_through_flow_into_loop_does_not_deadlock(self):
+        # More items than the shared loop pool's 64 workers; each reaches a
+        # nested loop through a flow node.
+        def outer():
+            @loop(100)
+            def results(i):
+                return middle(1)
+            return results
+
+        hung, result = run_with_timeout(outer)
+        self.assertFalse(hung, "nested loops deadlocked")
+        self.assertEqual(result, [[3] * 100])
+
+
+class AsyncLoopContextTest(unittest.TestCase):
+    def test_concurrency_context_reaches_coroutine_function(self):
+        async def echo(item, concurrency):
+            return item, concurrency
+
+        self.assertEqual(loop([1, 2], concurrency=3)(echo), [(1, 3), (2, 3)])
+
+    def test_aloop_rejects_concurrency_below_one(self):
+        with self.assertRaises(ValueError):
+            aloop([1], concurrency=0)
+
+
+
+class LoopBehaviourTest(unittest.TestCase):
+    def tearDown(self):
+        with_context()
+
+    def test_loop_returns_results_in_input_order(self):
+        @loop([3, 1, 2])
+        def results(n):
+            time.sleep(n * 0.01)
+            return n
+        self.assertEqual(results, [3, 1, 2])
+
+    def test_iloop_yields_in_completion_order(self):
+        @iloop([3, 1, 2])
+        def results(n):
+            time.sleep(n * 0.05)
+            return n * 10
+        self.assertEqual(list(results), [(1, 10), (2, 20), (0, 30)])
+
+    def test_aloop_returns_results_in_input_order(self):
+        @aloop([3, 1, 2], concurrency=2)
+        async def results(n):
+            await asyncio.sleep(n * 0.01)
+            return n
+        self.assertEqual(asyncio.run(results), [3, 1, 2])
+
+    def test_context_is_merged_and_overridable(self):
+        with_context(a=1, b=2)
+        self.assertEqual(loop([0])(lambda i, a, b: (a, b)), [(1, 2)])
+        self.assertEqual(list(iloop([0], b=3)(lambda i, a, b: (a, b))), [(0, (1, 3))])
+
+        async def pair(i, a, b):
+            return a, b
+        self.assertEqual(asyncio.run(aloop([0], b=4)(pair)), [(1, 4)])
+
+    def test_loop_cancels_queued_items_after_a_failure(self):
+        ran = []
+
+        def work(i):
+            if i == 0:
+                raise ValueError("boom")
+            time.sleep(0.05)
+            ran.append(i)
+
+        with self.assertRaises(ValueError):
+            loop(200)(work)
+        time.sleep(0.5)
+        self.assertLessEqual(len(ran), _LOOP_MAX_WORKERS)
+
+    def test_iloop_cancels_queued_items_when_closed(self):
+        ran = []
+
+        def work(i):
+            time.sleep(0.05)
+            ran.append(i)
+            return i
+
+        results = iloop(300)(work)
+        next(results)
+        results.close()
+        time.sleep(0.5)
+        self.assertLessEqual(len(ran), 2 * _LOOP_MAX_WORKERS)
+
+    def test_iloop_cancels_queued_items_after_a_failure(self):
+        ran = []
+
+        def work(i):
+            if i == 0:
+                raise ValueError("boom")
+            time.sleep(0.05)
+            ran.append(i)
+
+        with self.assertRaises(ValueError):
+            for _ in iloop(200)(work):
+                pass
+        time.sleep(0.5)
+        self.assertLessEqual(len(ran), _LOOP_MAX_WORKERS)
+
+    def test_iloop_rejects_coroutine_functions(self):
+        async def work(i):
+            return i
+        with self.assertRaises(TypeError):
+            iloop([1])(work)
+
+
+if __name__ == "__main__":
+    unittest.main()